@@ -0,0 +1,280 @@
+"""
+Asyncio API Wrapper for NOAA API V3
+===================================
+Same endpoints as noaa_sdk.noaa.NOAA, but built on top of aiohttp so that
+independent requests (eg. observations of several stations, or several
+forecast types of one point) are sent concurrently.
+
+Requires Python 3.6+ and the optional dependency aiohttp
+(pip install noaa-sdk[async]).
+"""
+
+import asyncio
+
+import aiohttp
+
+from noaa_sdk.accept import ACCEPT
+from noaa_sdk.errors import RetryTimeoutError, ServiceUnavilableError
+from noaa_sdk.util import (
+    _FORECAST_URI, build_uri, check_accept, to_iso_timestamp)
+
+
+class AsyncNOAA(object):
+    """Asyncio class for getting data from NOAA.
+
+    Usage:
+        async with AsyncNOAA() as n:
+            res = await n.points_forecast(40.7314, -73.8656)
+    """
+
+    DEFAULT_END_POINT = 'api.weather.gov'
+    DEFAULT_USER_AGENT = 'Test (your@email.com)'
+    MAX_RETRIES = 3
+
+    def __init__(self, user_agent=None, accept=None, show_uri=False):
+        """Constructor.
+
+        Args:
+            user_agent (str[optional]): user agent specified in the header.
+            accept (str[optional]): accept string specified in the header.
+            show_uri (boolean[optional]): True for showing the
+                actual url with query string being sent for requesting data.
+        """
+        if not user_agent:
+            user_agent = self.DEFAULT_USER_AGENT
+        if not accept:
+            accept = ACCEPT.GEOJSON
+        check_accept(accept)
+
+        self._show_uri = show_uri
+        self._user_agent = user_agent
+        self._accept = accept
+        # The aiohttp session must be created within a running event loop,
+        # so it is created lazily by the session property.
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def show_uri(self):
+        return self._show_uri
+
+    @show_uri.setter
+    def show_uri(self, value):
+        self._show_uri = value
+
+    def get_request_header(self):
+        """Get required headers.
+
+        Returns:
+            dict: headers with user agent and accept string.
+        """
+        return {
+            'User-Agent': self._user_agent,
+            'accept': self._accept
+        }
+
+    @property
+    def session(self):
+        """Lazily created aiohttp session shared by all requests."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.get_request_header())
+        return self._session
+
+    async def close(self):
+        """Close the underlying aiohttp session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get(self, uri, end_point=None):
+        """Encapsulate code for GET request.
+
+        Failed requests are retried MAX_RETRIES times with the same
+        fibonacci back-off as the sync client.
+
+        Args:
+            uri (str): uri with query string, or a full url.
+            end_point (str): end point host.
+
+        Returns:
+            dict: dictionary response.
+        """
+        if self._show_uri:
+            print('Calling: {}'.format(uri))
+        if not end_point:
+            raise Exception('Error: end_point is None.')
+
+        if 'http://' in uri or 'https://' in uri:
+            url = uri
+        else:
+            url = 'https://{}{}'.format(end_point, uri)
+
+        fib_num_a = 1
+        fib_num_b = 1
+        error = None
+        for retry in range(self.MAX_RETRIES + 1):
+            try:
+                async with self.session.get(url) as response:
+                    if response.status == 200:
+                        return await response.json(content_type=None)
+                    if response.status == 503:
+                        raise ServiceUnavilableError(
+                            "NOAA services are reportedly offline.")
+                    error = 'status {}: {}'.format(
+                        response.status, await response.text())
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                error = err
+            if retry < self.MAX_RETRIES:
+                new_interval = fib_num_b + fib_num_a
+                fib_num_a = fib_num_b
+                fib_num_b = new_interval
+                await asyncio.sleep(new_interval)
+
+        raise RetryTimeoutError(
+            'Maximum retries exceeded. Last error: {}'.format(error))
+
+    async def points(self, point, stations=False):
+        """Metadata about a point. See NOAA.points.
+
+        Args:
+            point (str): lat,long.
+            stations (boolean): True for finding stations.
+        Returns:
+            json: json response from api.
+        """
+        if stations:
+            return await self._get(
+                "/points/{point}/stations".format(point=point),
+                end_point=self.DEFAULT_END_POINT)
+        return await self._get(
+            "/points/{point}".format(point=point),
+            end_point=self.DEFAULT_END_POINT)
+
+    async def points_forecast(self, lat, long, data_type=None):
+        """Get forecasts of a point, one request per data type issued
+        concurrently. See NOAA.points_forecast.
+
+        Args:
+            lat (float): latitude of the weather station coordinate.
+            long (float): longitude of the weather station coordinate.
+            data_type (str|list[optional]): "hourly", "grid" or None.
+        Returns:
+            list: json responses from api, in the order of data_type.
+        """
+        if not isinstance(data_type, list):
+            data_type = [data_type]
+
+        for dtype in data_type:
+            assert dtype in _FORECAST_URI
+
+        points = await self.points('{:.4f},{:.4f}'.format(lat, long))
+
+        uris = [points['properties'][_FORECAST_URI[dtype]] for dtype in data_type]
+
+        return list(await asyncio.gather(
+            *(self._get(uri, end_point=self.DEFAULT_END_POINT)
+              for uri in uris)))
+
+    async def stations_observations(self, station_id, **params):
+        """Get observation data from specific station.
+        See NOAA.stations_observations.
+
+        Args:
+            station_id (str): station id.
+            start (str[optional]): start date of observation.
+            end (str[optional]): end date of observation.
+            limit (int[optional]): limit of results.
+            current (bool[optional]): True if needs current observations.
+            recordId (str[optional]): recordId, Record Id (ISO8601DateTime)
+        Returns:
+            list: list of observation features, or the json response of the
+                single observation when current or recordId is given.
+        """
+        if not station_id:
+            raise Exception("'station_id' is required.")
+        if 'recordId' in params and 'current' in params:
+            raise Exception("Cannot have both 'current' and 'recordId'")
+        if 'start' in params:
+            params['start'] = to_iso_timestamp(params['start'])
+        if 'end' in params:
+            params['end'] = to_iso_timestamp(params['end'], end=True)
+
+        request_uri = "/stations/{stationId}/observations".format(
+            stationId=station_id)
+
+        if 'recordId' in params:
+            return await self._get(
+                '{old_request_uri}/{recordId}'.format(
+                    old_request_uri=request_uri,
+                    recordId=params['recordId']),
+                end_point=self.DEFAULT_END_POINT)
+        if 'current' in params:
+            return await self._get(
+                '{old_request_uri}/current'.format(
+                    old_request_uri=request_uri),
+                end_point=self.DEFAULT_END_POINT)
+
+        observations = await self._get(
+            build_uri(request_uri, params), end_point=self.DEFAULT_END_POINT)
+        if 'features' not in observations:
+            raise Exception(observations)
+        return observations['features']
+
+    async def get_observations_by_lat_lon(
+            self, lat, lon, start=None, end=None, num_of_stations=1):
+        """Same as NOAA.get_observations_by_lat_lon() but the observations
+        of all requested stations are fetched concurrently.
+
+        Observations are yielded station by station, in order of completion.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+            start (str[optional]): start date of observation.
+            end (str[optional]): end date of observation.
+            num_of_stations (int[optional]): get observations from the
+                nearest x stations. (Put -1 of wants to get all stations.)
+        Returns:
+            async generator: observation dictionaries.
+        """
+        stations_observations_params = {}
+        if start:
+            stations_observations_params['start'] = start
+        if end:
+            stations_observations_params['end'] = end
+
+        points_res = await self.points(
+            '{:.4f},{:.4f}'.format(lat, lon))
+
+        if 'properties' not in points_res or 'observationStations' not in points_res['properties']:
+            raise Exception('Error: No Observation Stations found.')
+        stations = (await self._get(
+            points_res['properties']['observationStations'],
+            end_point=self.DEFAULT_END_POINT))['observationStations']
+
+        if num_of_stations > 0:
+            stations = stations[:num_of_stations]
+
+        tasks = [
+            asyncio.ensure_future(self.stations_observations(
+                station.split('/')[-1], **dict(stations_observations_params)))
+            for station in stations]
+        try:
+            for task in asyncio.as_completed(tasks):
+                for observation in await task:
+                    yield observation.get('properties')
+        finally:
+            # Stop downloading stations that are no longer needed when a
+            # station failed or the consumer stopped early, and retrieve
+            # the errors of the finished ones so they aren't logged.
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()
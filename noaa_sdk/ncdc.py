@@ -1,7 +1,4 @@
-from urllib.parse import urlencode
-import requests
-
-from noaa_sdk.util import UTIL
+from noaa_sdk.util import UTIL, build_uri, json_loads
 
 
 class NCDC(UTIL):
@@ -54,11 +51,11 @@ class NCDC(UTIL):
         if not end_point:
             raise Exception('Error: end_point is None.')
 
-        res = requests.get(
+        res = self._session.get(
             'https://{}/{}'.format(self.DEFAULT_END_POINT, uri),
             headers=header)
         if res.status_code == 200:
-            return res.json()
+            return json_loads(res.content)
         raise Exception('Error: {} {}'.format(res.status_code, res.reason))
 
     def get_request_header(self):
@@ -80,7 +77,7 @@ class NCDC(UTIL):
         return self.make_get_request(
             end_point=self.DEFAULT_END_POINT,
             header=self.get_request_header(),
-            uri='cdo-web/api/v2/{}?{}'.format(end_point, urlencode(params)))
+            uri=build_uri('cdo-web/api/v2/{}'.format(end_point), params))
 
     def datasets(self, **params):
         """ Request datasets endpoint.
@@ -7,21 +7,269 @@ visit: https://www.weather.gov/documentation/services-web-api
 
 """
 
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import copy
+import io
 import json
 import math
-from urllib.parse import urlencode
+import os
+import re
+import tempfile
+import threading
+import zipfile
+import numpy as np
 import pgeocode
+import requests
 from uszipcode import SearchEngine
 
-from noaa_sdk.util import UTIL
+from noaa_sdk.util import (
+    UTIL, TTLCache, _FORECAST_URI, build_uri, json_loads, to_iso_timestamp)
 from noaa_sdk.accept import ACCEPT
 from noaa_sdk.errors import InvalidZipCodeError
 
+# points() properties used internally, extracted from the raw response.
+_POINTS_URI_RES = {
+    name: re.compile(
+        b'"' + name.encode() + rb'"\s*:\s*"([^"\\]+)"')
+    for name in (
+        'forecast', 'forecastHourly', 'forecastGridData',
+        'observationStations')
+}
+
+
+def _format_point(lat, lon):
+    """Format a coordinate as the 'lat,lon' point of the api, with a fixed
+    4 decimal precision so the same location always gives the same uri
+    (and cache key)."""
+    return '{:.4f},{:.4f}'.format(lat, lon)
+
+
+_US_SEARCH_ENGINES = {}
+_US_SEARCH_ENGINES_LOCK = threading.Lock()
+
+
+def _uszipcode_search_engine(db_file_dir=None):
+    """Shared uszipcode search engine (opening its database is slow).
+
+    Only the first call per database directory takes the lock, so
+    concurrent first lookups still open the database once.
+    """
+    search = _US_SEARCH_ENGINES.get(db_file_dir)
+    if search is None:
+        with _US_SEARCH_ENGINES_LOCK:
+            search = _US_SEARCH_ENGINES.get(db_file_dir)
+            if search is None:
+                if db_file_dir:
+                    search = SearchEngine(
+                        simple_zipcode=True, db_file_dir=db_file_dir)
+                else:
+                    search = SearchEngine(simple_zipcode=True)
+                _US_SEARCH_ENGINES[db_file_dir] = search
+    return search
+
+
+@lru_cache(maxsize=None)
+def _nominatim(country):
+    """Shared pgeocode Nominatim per country (loading its data is slow)."""
+    return pgeocode.Nominatim(country)
+
+
+GEONAMES_URL = 'https://download.geonames.org/export/zip/{country}.zip'
+GEONAMES_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'noaa_sdk', 'geonames')
+_GEONAMES_LOCK = threading.Lock()
+
+
+def _normalize_postal_code(postal_code, country):
+    """Normalize a postal code the way pgeocode does (GeoNames only has
+    the first part of GB, IE and CA postal codes)."""
+    postal_code = str(postal_code).strip().upper()
+    if country.upper() in ('GB', 'IE', 'CA') and postal_code:
+        postal_code = postal_code.split()[0]
+    return postal_code
+
+
+def _parse_geonames(lines):
+    """Build the postal code table of a GeoNames postal code dump.
+
+    Args:
+        lines (iterable): tab separated lines of a GeoNames '{country}.txt'.
+    Returns:
+        dict: {postal_code: (lat, lon)}, places sharing a postal code
+            are averaged like pgeocode does.
+    """
+    sums = {}
+    for line in lines:
+        fields = line.rstrip('\n').split('\t')
+        if len(fields) < 11:
+            continue
+        try:
+            lat, lon = float(fields[9]), float(fields[10])
+        except ValueError:
+            continue
+        total = sums.setdefault(fields[1].upper(), [0.0, 0.0, 0])
+        total[0] += lat
+        total[1] += lon
+        total[2] += 1
+    return {
+        postal_code: (lat / count, lon / count)
+        for postal_code, (lat, lon, count) in sums.items()}
+
+
+def _write_atomic(path, data):
+    """Write bytes to path through a unique temporary file, so concurrent
+    writers (threads or processes) never interleave or leave a truncated
+    file behind."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _load_geonames_table(table_path):
+    """Load a postal code table stored by _geonames_postal_codes.
+
+    Returns:
+        dict: {postal_code: (lat, lon)}, or None if there is no table or it
+            is corrupted (the corrupted table is removed).
+    """
+    if not os.path.exists(table_path):
+        return None
+    with open(table_path, 'rb') as table_file:
+        data = table_file.read()
+    try:
+        return {
+            postal_code: tuple(lat_lon)
+            for postal_code, lat_lon in json_loads(data).items()}
+    except (ValueError, AttributeError, TypeError):
+        os.remove(table_path)
+        return None
+
+
+@lru_cache(maxsize=None)
+def _geonames_postal_codes(country):
+    """Postal code table of a country, built from the GeoNames dump.
+
+    The dump is downloaded once to GEONAMES_CACHE_DIR, and the table is
+    stored next to it as json so later processes just load a dict. A
+    corrupted table is rebuilt from the dump.
+
+    Args:
+        country (str): 2 letter country code.
+    Returns:
+        dict: {postal_code: (lat, lon)}.
+    """
+    country = country.upper()
+    txt_path = os.path.join(GEONAMES_CACHE_DIR, '{}.txt'.format(country))
+    table_path = os.path.join(GEONAMES_CACHE_DIR, '{}.json'.format(country))
+
+    # lru_cache doesn't serialize first calls, so concurrent first lookups
+    # would otherwise all download and build the table.
+    with _GEONAMES_LOCK:
+        postal_codes = _load_geonames_table(table_path)
+        if postal_codes is not None:
+            return postal_codes
+
+        os.makedirs(GEONAMES_CACHE_DIR, exist_ok=True)
+        if not os.path.exists(txt_path):
+            response = requests.get(
+                GEONAMES_URL.format(country=country), timeout=60)
+            response.raise_for_status()
+            with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+                _write_atomic(
+                    txt_path, archive.read('{}.txt'.format(country)))
+
+        with open(txt_path, encoding='utf-8') as txt_file:
+            postal_codes = _parse_geonames(txt_file)
+
+        _write_atomic(table_path, json.dumps(postal_codes).encode('utf-8'))
+        return postal_codes
+
+
+def _lookup_geonames_postal_code(postal_code, country):
+    """Latitude and longitude of a non US postal code."""
+    lat_lon = _geonames_postal_codes(country).get(
+        _normalize_postal_code(postal_code, country))
+    if lat_lon is None:
+        raise InvalidZipCodeError('Invalid ZIP Code')
+    return lat_lon
+
+
+def _query_postal_code(postal_code, country='US', db_file_dir=None):
+    """Look up a postal code.
+
+    Args:
+        postal_code (str): postal code.
+        country (str): 2 letter country code.
+        db_file_dir (str[optional]): uszipcode database directory.
+    Returns:
+        tuple: latitude, longitude and the raw search result.
+    """
+    if country == "US":
+        zipcode = _uszipcode_search_engine(db_file_dir).by_zipcode(
+            postal_code)
+
+        if zipcode.lat is None or zipcode.lng is None:
+            raise InvalidZipCodeError('Invalid ZIP Code')
+
+        return zipcode.lat, zipcode.lng, zipcode
+
+    query_results = _nominatim(country).query_postal_code(postal_code)
+
+    if math.isnan(query_results.latitude) or math.isnan(query_results.longitude):
+        raise InvalidZipCodeError('Invalid ZIP Code')
+
+    return query_results.latitude, query_results.longitude, query_results
+
+
+@lru_cache(maxsize=4096)
+def _resolve_postal_code(postal_code, country='US', db_file_dir=None):
+    """Memoized latitude and longitude of a postal code."""
+    if country != "US":
+        return _lookup_geonames_postal_code(postal_code, country)
+    lat, lon, _ = _query_postal_code(postal_code, country, db_file_dir)
+    return lat, lon
+
+
 class NOAA(UTIL):
     """Main class for getting data from NOAA."""
 
     DEFAULT_END_POINT = 'api.weather.gov'
     DEFAULT_USER_AGENT = 'Test (your@email.com)'
+    METADATA_CACHE_SIZE = 1024
+    METADATA_CACHE_TTL = 86400
+    STATIONS_CACHE_SIZE = 1024
+    STATIONS_CACHE_TTL = 7 * 86400
+    MAX_WORKERS = 8
+    # Stations whose observations are fetched ahead of the consumer.
+    STATIONS_WINDOW = 2
+
+    # Routes of the endpoints taking their ids as params, checked in order.
+    # The first route whose params are all present is requested.
+    _PRODUCTS_TYPES_ROUTES = (
+        (('type_id', 'locations', 'location_id'),
+         '/products/types/{type_id}/locations/{location_id}'),
+        (('type_id', 'locations'), '/products/types/{type_id}/locations'),
+        (('type_id',), '/products/types/{type_id}'),
+    )
+    _PRODUCTS_LOCATIONS_ROUTES = (
+        (('location_id',), '/products/locations/{location_id}/types'),
+    )
+    _ALERTS_ROUTES = (
+        (('alert_id',), '/alerts/{alert_id}'),
+    )
+    _ACTIVE_ALERT_ROUTES = (
+        (('zone_id',), '/alerts/active/zone/{zone_id}'),
+        (('area',), '/alerts/active/area/{area}'),
+        (('region',), '/alerts/active/region/{region}'),
+    )
 
     def __init__(self, user_agent=None, accept=None, show_uri=False):
         """Constructor.
@@ -40,33 +288,130 @@ class NOAA(UTIL):
         super().__init__(
             user_agent=user_agent, accept=accept,
             show_uri=show_uri)
+        # Point, office and zone metadata barely ever change, so their
+        # responses are kept for a day instead of being fetched every call.
+        self._metadata_cache = TTLCache(
+            maxsize=self.METADATA_CACHE_SIZE, ttl=self.METADATA_CACHE_TTL)
+        # Stations assigned to a point change every few months at most, so
+        # a list may be up to a week stale before it is fetched again.
+        self._stations_cache = TTLCache(
+            maxsize=self.STATIONS_CACHE_SIZE, ttl=self.STATIONS_CACHE_TTL)
+        # Independent requests (several forecast types, several stations)
+        # are sent concurrently on this pool.
+        self._pool = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+
+    def close(self):
+        """Shut down the request thread pool and close the http session."""
+        self._pool.shutdown(wait=False)
+        super().close()
+
+    def _make_routed_get_request(self, routes, default_uri, params):
+        """Request the first route of routes whose params are all present.
+
+        Args:
+            routes (tuple): (param names, uri template) pairs.
+            default_uri (str): uri requested when no route matches.
+            params (dict): endpoint params.
+        Returns:
+            json: json response from api.
+        """
+        for names, uri in routes:
+            if all(name in params for name in names):
+                return self.make_get_request(
+                    uri.format(**params), end_point=self.DEFAULT_END_POINT)
+        return self.make_get_request(
+            default_uri, end_point=self.DEFAULT_END_POINT)
+
+    def clear_cache(self):
+        """Drop all cached metadata and observation stations responses."""
+        self._metadata_cache.clear()
+        self._stations_cache.clear()
+
+    def _make_cached_get_request(self, uri, cache=None):
+        """Same as make_get_request() on the default end point, but the
+        response is served from cache when available.
+
+        Error responses (with 'status' and 'detail') are never cached.
+        Callers always get a copy, so mutating it doesn't alter the cache.
+
+        Args:
+            uri (str): uri with query string.
+            cache (TTLCache[optional]): cache to use, defaults to the
+                metadata cache.
+        Returns:
+            json: json response from api.
+        """
+        if cache is None:
+            cache = self._metadata_cache
+        response = cache.get(uri)
+        if response is None:
+            response = self.make_get_request(
+                uri, end_point=self.DEFAULT_END_POINT)
+            if not (isinstance(response, dict) and
+                    'status' in response and 'detail' in response):
+                cache.set(uri, response)
+        return copy.deepcopy(response)
 
     def get_lat_lon_by_postalcode_country(self, postal_code, country='US', return_result_object=False, db_file_dir=None):
-        if country == "US":
-            if db_file_dir:
-                search = SearchEngine(simple_zipcode=True, db_file_dir=db_file_dir)
-            else:
-                search = SearchEngine(simple_zipcode=True)
-            zipcode = search.by_zipcode(postal_code)
-
-            if zipcode.lat is None or zipcode.lng is None:
-                raise InvalidZipCodeError('Invalid ZIP Code')
-            
-            if return_result_object:
-                return zipcode.lat, zipcode.lng, zipcode
-            
-            return zipcode.lat, zipcode.lng
-        else:
-            nomi = pgeocode.Nominatim(country)
-            query_results = nomi.query_postal_code(postal_code)
+        """Get latitude and longitude of a postal code.
 
-            if math.isnan(query_results.latitude) or math.isnan(query_results.longitude):
-                raise InvalidZipCodeError('Invalid ZIP Code')
-            
-            if return_result_object:
-                return query_results.latitude, query_results.longitude, query_results
+        Lookups are memoized for the lifetime of the process, except when
+        the search result object is requested. Non US postal codes are
+        looked up in a GeoNames postal code table cached on disk, pgeocode
+        is only used to build the search result object.
 
-            return query_results.latitude, query_results.longitude
+        Args:
+            postal_code (str): postal code.
+            country (str): 2 letter country code.
+            return_result_object (boolean[optional]): True to also return
+                the uszipcode / pgeocode search result.
+            db_file_dir (str[optional]): uszipcode database directory.
+        Returns:
+            tuple: (lat, lon) or (lat, lon, result_object).
+        """
+        if return_result_object:
+            return _query_postal_code(postal_code, country, db_file_dir)
+        return _resolve_postal_code(postal_code, country, db_file_dir)
+
+    def get_lat_lon_bulk(self, postal_codes, country='US', db_file_dir=None):
+        """Get latitudes and longitudes of many postal codes at once.
+
+        Non US postal codes are looked up in the cached GeoNames postal
+        code table of the country. US zip codes are looked up one by one
+        on the shared uszipcode search engine.
+
+        Args:
+            postal_codes (list): postal codes.
+            country (str): 2 letter country code.
+            db_file_dir (str[optional]): uszipcode database directory.
+        Returns:
+            numpy.ndarray: array of shape (len(postal_codes), 2) with
+                latitude and longitude of each postal code.
+        """
+        if country == "US":
+            search = _uszipcode_search_engine(db_file_dir)
+            coordinates = []
+            for postal_code in postal_codes:
+                zipcode = search.by_zipcode(postal_code)
+                coordinates.append((
+                    np.nan if zipcode.lat is None else zipcode.lat,
+                    np.nan if zipcode.lng is None else zipcode.lng))
+            coordinates = np.array(coordinates, dtype=float).reshape(-1, 2)
+        else:
+            table = _geonames_postal_codes(country)
+            coordinates = np.array([
+                table.get(
+                    _normalize_postal_code(postal_code, country),
+                    (np.nan, np.nan))
+                for postal_code in postal_codes], dtype=float).reshape(-1, 2)
+
+        invalid = np.flatnonzero(np.isnan(coordinates).any(axis=1))
+        if len(invalid):
+            raise InvalidZipCodeError(
+                'Invalid ZIP Code at index {}: {}'.format(
+                    invalid.tolist(),
+                    [postal_codes[i] for i in invalid]))
+        return coordinates
 
     def get_forecasts(self, postal_code, country, data_type="grid", return_result_object=False, db_file_dir=None):
         """Get forecasts by postal code and country code.
@@ -86,10 +431,13 @@ class NOAA(UTIL):
         else:
             lat, lon = postalcode_search_result
         
-        if type(data_type) is not list:
+        if not isinstance(data_type, list):
             data_type = [data_type]
-        
-        results = self.points_forecast(lat, lon, data_type=data_type)
+
+        points_res = self._points_minimal(
+            _format_point(lat, lon))
+        results = self.points_forecast(
+            lat, lon, data_type=data_type, points_response=points_res)
 
         to_return = []
         for dtype, res in zip(data_type, results):
@@ -147,8 +495,24 @@ class NOAA(UTIL):
         return self.get_observations_by_lat_lon(lat, lon, start, end, num_of_stations)
         
     def get_observations_by_lat_lon(
-            self, lat, lon, start=None, end=None, num_of_stations=1):
-        "Same as get_observations() but uses Lat and Lon instead of Postalcode and Country"
+            self, lat, lon, start=None, end=None, num_of_stations=1,
+            points_response=None):
+        """Same as get_observations() but uses Lat and Lon instead of Postalcode and Country.
+
+        Args:
+            lat (float): latitude.
+            lon (float): longitude.
+            start (str[optional]): start date of observation.
+            end (str[optional]): end date of observation.
+            num_of_stations (int[optional]): get observations from the
+                nearest x stations. (Put -1 of wants to get all stations.)
+                The list of stations of a point is cached for up to
+                STATIONS_CACHE_TTL seconds (a week).
+            points_response (dict[optional]): response of points() for this
+                coordinate if already fetched, to avoid requesting it again.
+        Returns:
+            generator: generator of dictionaries of observations.
+        """
 
         stations_observations_params = {}
         if start:
@@ -156,27 +520,52 @@ class NOAA(UTIL):
         if end:
             stations_observations_params['end'] = end
 
-        points_res = self.points(
-            '{},{}'.format(round(lat, 4), round(lon, 4)))
+        points_res = points_response
+        if points_res is None:
+            points_res = self._points_minimal(
+                _format_point(lat, lon))
 
         if 'properties' not in points_res or 'observationStations' not in points_res['properties']:
             raise Exception('Error: No Observation Stations found.')
-        stations = self.make_get_request(
-            uri=points_res['properties']['observationStations'],
-            end_point=self.DEFAULT_END_POINT)['observationStations']
-
-        for index, station in enumerate(stations):
-            if num_of_stations > 0 and num_of_stations <= index:
-                break
-            station_id = station.split('/')[-1]
-            response = self.stations_observations(
-                station_id=station_id, **stations_observations_params)
-
-            observations = response
-            if type(response) == dict:
-                observations = response['features']
-            for observation in observations:
-                yield observation.get('properties')
+        stations = self._make_cached_get_request(
+            points_res['properties']['observationStations'],
+            cache=self._stations_cache)['observationStations']
+
+        if num_of_stations > 0:
+            stations = stations[:num_of_stations]
+        # Only the properties of each observation feature are parsed.
+        streams = [
+            self._stream_stations_observations(
+                station.split('/')[-1], 'features.item.properties',
+                dict(stations_observations_params))
+            for station in stations]
+
+        if len(streams) == 1:
+            # A single station is streamed as it is parsed.
+            yield from streams[0]
+            return
+
+        # Several stations are fetched concurrently, but only
+        # STATIONS_WINDOW of them ahead of the consumer, and yielded
+        # nearest station first.
+        pending = iter(streams)
+        futures = deque()
+
+        def submit_next():
+            stream = next(pending, None)
+            if stream is not None:
+                futures.append(self._pool.submit(list, stream))
+
+        for _ in range(self.STATIONS_WINDOW):
+            submit_next()
+        try:
+            while futures:
+                observations = futures.popleft().result()
+                submit_next()
+                yield from observations
+        finally:
+            for future in futures:
+                future.cancel()
 
     def get_observations_by_postalcode_country(
             self, postalcode, country, start=None, end=None, num_of_stations=1):
@@ -202,14 +591,48 @@ class NOAA(UTIL):
         """
 
         if stations:
-            return self.make_get_request(
-                "/points/{point}/stations".format(point=point),
-                end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request(
-            "/points/{point}".format(point=point),
-            end_point=self.DEFAULT_END_POINT)
+            return self._make_cached_get_request(
+                "/points/{point}/stations".format(point=point))
+        return self._make_cached_get_request(
+            "/points/{point}".format(point=point))
+
+    def _points_minimal(self, point):
+        """Same as points() but only the forecast and observation stations
+        uris are extracted from the raw response, skipping the json parsing
+        of the whole document. Used internally by points_forecast and
+        get_observations_by_lat_lon.
 
-    def points_forecast(self, lat, long, data_type=None):
+        Falls back to the fully parsed response when any uri is missing
+        (eg. error responses).
+
+        Args:
+            point (str): lat,long.
+        Returns:
+            dict: {'properties': {name: uri}} with the 'forecast',
+                'forecastHourly', 'forecastGridData' and
+                'observationStations' uris.
+        """
+        uri = "/points/{point}".format(point=point)
+        cache_key = (uri, 'minimal')
+        points = self._metadata_cache.get(cache_key)
+        if points is None:
+            points = self._metadata_cache.get(uri)
+        if points is not None:
+            return points
+
+        body = self.make_get_raw_request(uri, end_point=self.DEFAULT_END_POINT)
+        properties = {}
+        for name, regex in _POINTS_URI_RES.items():
+            match = regex.search(body)
+            if match is None:
+                return json_loads(body)
+            properties[name] = match.group(1).decode()
+
+        points = {'properties': properties}
+        self._metadata_cache.set(cache_key, points)
+        return points
+
+    def points_forecast(self, lat, long, data_type=None, points_response=None):
         """Get observation data from a weather station.
 
         Response in this method should not be modified.
@@ -220,30 +643,30 @@ class NOAA(UTIL):
             lat (float): latitude of the weather station coordinate.
             long (float): longitude of the weather station coordinate.
             hourly (boolean[optional]): True for getting hourly forecast.
+            points_response (dict[optional]): response of points() for this
+                coordinate if already fetched, to avoid requesting it again.
         Returns:
             json: json response from api.
         """
-        if type(data_type) is not list:
+        if not isinstance(data_type, list):
             data_type = [data_type]
 
         for dtype in data_type:
-            assert dtype in ["hourly", "grid", None]
-
-        points = self.make_get_request(
-            "/points/{lat},{long}".format(
-                lat=lat, long=long), end_point=self.DEFAULT_END_POINT)
-        
-        responses = []
-        for dtype in data_type:
-            uri = points['properties']['forecast']
-            if dtype == "hourly":
-                uri = points['properties']['forecastHourly']
-            elif dtype == "grid":
-                uri = points['properties']['forecastGridData']
-            response = self.make_get_request(uri=uri, end_point=self.DEFAULT_END_POINT)
-            responses.append(response)
-        
-        return responses
+            assert dtype in _FORECAST_URI
+
+        points = points_response
+        if points is None:
+            points = self._points_minimal(
+                _format_point(lat, long))
+
+        uris = [points['properties'][_FORECAST_URI[dtype]] for dtype in data_type]
+        if len(uris) == 1:
+            return [self.make_get_request(
+                uri=uris[0], end_point=self.DEFAULT_END_POINT)]
+        return list(self._pool.map(
+            lambda uri: self.make_get_request(
+                uri=uri, end_point=self.DEFAULT_END_POINT),
+            uris))
 
     def stations(self, **params):
         """Get list of US weather stations and their metadata.
@@ -259,16 +682,27 @@ class NOAA(UTIL):
         Returns:
             json: json response from api.
         """
-        if len(params) > 0:
-            if 'station_id' in params:
-                params['id'] = params['station_id']
-                del params['station_id']
-            return self.make_get_request(
-                "/stations?{query_string}".format(
-                    query_string=urlencode(params)),
-                end_point=self.DEFAULT_END_POINT)
+        if 'station_id' in params:
+            params['id'] = params.pop('station_id')
         return self.make_get_request(
-            "/stations", end_point=self.DEFAULT_END_POINT)
+            build_uri("/stations", params), end_point=self.DEFAULT_END_POINT)
+
+    def _check_stations_observations_params(self, station_id, params):
+        """Validate stations observations params and normalize 'start' and
+        'end' (in place) to the '%Y-%m-%dT%H:%M:%SZ' format.
+
+        Args:
+            station_id (str): station id.
+            params (dict): params of stations_observations.
+        """
+        if not station_id:
+            raise Exception("'station_id' is required.")
+        if 'recordId' in params and 'current' in params:
+            raise Exception("Cannot have both 'current' and 'recordId'")
+        if 'start' in params:
+            params['start'] = to_iso_timestamp(params['start'])
+        if 'end' in params:
+            params['end'] = to_iso_timestamp(params['end'], end=True)
 
     def stations_observations(self, station_id, **params):
         """Get observation data from specific station.
@@ -292,28 +726,7 @@ class NOAA(UTIL):
             json: json response from api.
         """
 
-        if not station_id:
-            raise Exception("'station_id' is required.")
-        if 'recordId' in params and 'current' in params:
-            raise Exception("Cannot have both 'current' and 'recordId'")
-        if 'start' in params:
-            start = params['start']
-            self.parse_param_timestamp(start)
-            if len(start) < 19:
-                start = '{}T00:00:00Z'.format(start[:10])
-            elif len(params['start']) < 20:
-                start = start.replace(' ', 'T')
-                start = '{}Z'.format(start)
-            params['start'] = start
-        if 'end' in params:
-            end = params['end']
-            self.parse_param_timestamp(end)
-            if len(end) < 19:
-                end = '{}T23:59:59Z'.format(end[:10])
-            elif len(params['end']) < 20:
-                end = end.replace(' ', 'T')
-                end = '{}Z'.format(end)
-            params['end'] = end
+        self._check_stations_observations_params(station_id, params)
 
         request_uri = "/stations/{stationId}/observations".format(
             stationId=station_id)
@@ -331,13 +744,8 @@ class NOAA(UTIL):
                         old_request_uri=request_uri),
                     end_point=self.DEFAULT_END_POINT)
 
-            if len(params) > 1:
-                request_uri = '{old_request_uri}?{query_string}'.format(
-                    old_request_uri=request_uri,
-                    query_string=urlencode(params))
-
             observations = self.make_get_request(
-                request_uri, end_point=self.DEFAULT_END_POINT)
+                build_uri(request_uri, params), end_point=self.DEFAULT_END_POINT)
             if 'features' not in observations:
                 raise Exception(observations)
             return observations['features']
@@ -346,6 +754,49 @@ class NOAA(UTIL):
             "/stations/{stationId}/observations".format(stationId=station_id),
             end_point=self.DEFAULT_END_POINT)
 
+    def stations_observations_stream(self, station_id, **params):
+        """Same as stations_observations() but yields the observation
+        features one by one while the response is being parsed, instead of
+        loading the whole (possibly many MB) response in memory.
+
+        Args:
+            station_id (str): station id.
+            start (str[optional]): start date of observation
+                (eg. '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S').
+            end (str[optional]): end date of observation
+                (eg. '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S').
+            limit (int[optional]): limit of results.
+        Returns:
+            generator: observation features.
+        """
+        return self._stream_stations_observations(
+            station_id, 'features.item', params)
+
+    def _stream_stations_observations(self, station_id, prefix, params):
+        """Stream the objects under prefix (eg. 'features.item') of a
+        station observations response.
+
+        Args:
+            station_id (str): station id.
+            prefix (str): ijson prefix of the objects to yield.
+            params (dict): params of stations_observations.
+        Returns:
+            generator: objects found under prefix.
+        """
+        if 'recordId' in params or 'current' in params:
+            raise Exception(
+                "'current' and 'recordId' return a single observation, "
+                "use stations_observations instead.")
+        self._check_stations_observations_params(station_id, params)
+
+        return self.make_get_stream_request(
+            build_uri(
+                "/stations/{stationId}/observations".format(
+                    stationId=station_id),
+                params),
+            prefix,
+            end_point=self.DEFAULT_END_POINT)
+
     def products(self, id):
         """Get data of a product.
 
@@ -377,28 +828,10 @@ class NOAA(UTIL):
         Returns:
             json: json response from api.
         """
-        if 'type_id' in params and 'locations' not in params:
-            return self.make_get_request(
-                "/products/types/{type_id}".format(type_id=params['type_id']),
-                end_point=self.DEFAULT_END_POINT)
-        elif 'locations' in params:
-            if 'type_id' not in params:
-                raise Exception('Error: Missing type id (type_id=None)')
-            if 'location_id' in params:
-                return self.make_get_request(
-                    ('/products/types/{type_id}/locations/'
-                     '{location_id}').format(
-                        type_id=params['type_id'],
-                        location_id=params['location_id']),
-                    end_point=self.DEFAULT_END_POINT)
-            else:
-                return self.make_get_request(
-                    "/products/types/{type_id}/locations".format(
-                        type_id=params['type_id']),
-                    end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request(
-            "/products/types",
-            end_point=self.DEFAULT_END_POINT)
+        if 'locations' in params and 'type_id' not in params:
+            raise Exception('Error: Missing type id (type_id=None)')
+        return self._make_routed_get_request(
+            self._PRODUCTS_TYPES_ROUTES, "/products/types", params)
 
     def products_locations(self, **params):
         """A list of locations with active products.
@@ -412,14 +845,8 @@ class NOAA(UTIL):
         Returns:
             json: json response from api.
         """
-        if 'location_id' in params:
-            return self.make_get_request(
-                "/products/locations/{locationId}/types".format(
-                    locationId=params['location_id']),
-                end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request(
-            "/products/locations",
-            end_point=self.DEFAULT_END_POINT)
+        return self._make_routed_get_request(
+            self._PRODUCTS_LOCATIONS_ROUTES, "/products/locations", params)
 
     def offices(self, office_id):
         """Metadata about a Weather Office.
@@ -433,8 +860,8 @@ class NOAA(UTIL):
         Returns:
             json: json response from api.
         """
-        return self.make_get_request("/offices/{office_id}".format(
-            office_id=office_id), end_point=self.DEFAULT_END_POINT)
+        return self._make_cached_get_request("/offices/{office_id}".format(
+            office_id=office_id))
 
     def zones(self, type, zone_id, forecast=False):
         """Metadata for a zone and forecast data for zone.
@@ -455,8 +882,8 @@ class NOAA(UTIL):
                 "/zones/{type}/{zone_id}/forecast".format(
                     type=type, zone_id=zone_id),
                 end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request("/zones/{type}/{zone_id}".format(
-            type=type, zone_id=zone_id), end_point=self.DEFAULT_END_POINT)
+        return self._make_cached_get_request("/zones/{type}/{zone_id}".format(
+            type=type, zone_id=zone_id))
 
     def alerts(self, **params):
         """A list of alerts that can be filtered by parameters.
@@ -486,13 +913,8 @@ class NOAA(UTIL):
         Returns:
             json: json response from api.
         """
-        if 'alert_id' in params:
-            return self.make_get_request(
-                "/alerts/{alert_id}".format(alert_id=params['alert_id']),
-                end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request(
-            "/alerts?{query_string}".format(query_string=urlencode(params)),
-            end_point=self.DEFAULT_END_POINT)
+        return self._make_routed_get_request(
+            self._ALERTS_ROUTES, build_uri("/alerts", params), params)
 
     def active_alerts(self, count=False, **params):
         """Active alerts endpoints.
@@ -514,21 +936,5 @@ class NOAA(UTIL):
             return self.make_get_request(
                 "/alerts/count",
                 end_point=self.DEFAULT_END_POINT)
-        if 'zone_id' in params:
-            return self.make_get_request(
-                "/alerts/active/zone/{zoneId}".format(
-                    zoneId=params['zone_id']),
-                end_point=self.DEFAULT_END_POINT)
-        if 'area' in params:
-            return self.make_get_request(
-                "/alerts/active/area/{area}".format(
-                    area=params['area']),
-                end_point=self.DEFAULT_END_POINT)
-        if 'region' in params:
-            return self.make_get_request(
-                "/alerts/active/region/{region}".format(
-                    region=params['region']),
-                end_point=self.DEFAULT_END_POINT)
-        return self.make_get_request(
-            "/alerts/active",
-            end_point=self.DEFAULT_END_POINT)
+        return self._make_routed_get_request(
+            self._ACTIVE_ALERT_ROUTES, "/alerts/active", params)
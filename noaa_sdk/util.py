@@ -1,17 +1,238 @@
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 from datetime import datetime
 from functools import wraps
+import json
+import re
 import requests
+import threading
 import time
+from urllib.parse import urlencode
+from urllib3.util.request import ACCEPT_ENCODING as _DECODABLE_ENCODINGS
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 from noaa_sdk.accept import ACCEPT
 from noaa_sdk.errors import RetryTimeoutError, ServiceUnavilableError
 
 
+# points() property holding the forecast uri of each forecast data type.
+_FORECAST_URI = {
+    'hourly': 'forecastHourly',
+    'grid': 'forecastGridData',
+    None: 'forecast',
+}
+
+
+def build_uri(path, params=None):
+    """Append a url encoded query string to a uri.
+
+    Args:
+        path (str): uri path (eg. '/stations').
+        params (dict[optional]): query parameters.
+    Returns:
+        str: path with query string, or path alone when there are no params.
+    """
+    if not params:
+        return path
+    return '{}?{}'.format(path, urlencode(params, doseq=True))
+
+
+def accept_encoding(decodable_encodings):
+    """Build the Accept-Encoding header, smallest payloads first.
+
+    Args:
+        decodable_encodings (str): comma separated content encodings urllib3
+            can decode (brotli and zstd depend on the optional brotli /
+            zstandard packages).
+    Returns:
+        str: Accept-Encoding header value.
+    """
+    decodable = [i.strip() for i in decodable_encodings.split(',')]
+    return ', '.join(
+        encoding for encoding in ('zstd', 'br', 'gzip', 'deflate')
+        if encoding in decodable)
+
+
+ACCEPT_ENCODING = accept_encoding(_DECODABLE_ENCODINGS)
+
+
+def json_loads(data):
+    """Parse a json response body, with orjson when it is installed.
+
+    Args:
+        data (bytes|str): json document.
+    Returns:
+        parsed json.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    # json.loads() only accepts bytes since Python 3.6.
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+_ISO_RE = re.compile(
+    r'^(\d{4}-\d{2}-\d{2})(?:[ T](\d{2}:\d{2}:\d{2}))?Z?$')
+
+
+def to_iso_timestamp(str_date_time, end=False):
+    """Normalize a date time param to the '%Y-%m-%dT%H:%M:%SZ' format.
+
+    Args:
+        str_date_time (str): date time in 3 different formats:
+            '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S'
+        end (boolean[optional]): True to complete a date without time to
+            the end of the day instead of its start.
+    Returns:
+        str: date time in format '%Y-%m-%dT%H:%M:%SZ'.
+    """
+    match = None
+    if isinstance(str_date_time, str):
+        match = _ISO_RE.match(str_date_time)
+    if match:
+        date, time_of_day = match.groups()
+        if not time_of_day:
+            time_of_day = '23:59:59' if end else '00:00:00'
+        timestamp = '{}T{}Z'.format(date, time_of_day)
+        try:
+            # The regex only checks the shape, reject eg. '2017-02-30'.
+            datetime.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ')
+            return timestamp
+        except ValueError:
+            pass
+    raise Exception(
+        "Error: start and end must have "
+        "format '%Y-%m-%dT%H:%M:%SZ' | '%Y-%m-%d' | '%Y-%m-%d %H:%M:%S'")
+
+
+def iter_json_prefix(document, prefix):
+    """Iterate the objects of an already parsed json document found under
+    an ijson style prefix (eg. 'features.item').
+
+    Args:
+        document (dict|list): parsed json.
+        prefix (str): dot separated keys, 'item' stands for array items.
+    Returns:
+        iterator: matching objects.
+    """
+    items = [document]
+    for key in prefix.split('.') if prefix else []:
+        if key == 'item':
+            items = [i for item in items if isinstance(item, list)
+                     for i in item]
+        else:
+            items = [item[key] for item in items
+                     if isinstance(item, dict) and key in item]
+    return iter(items)
+
+
+def check_accept(accept):
+    """Raise if accept is not one of the ACCEPT strings.
+
+    Args:
+        accept (str): accept string specified in the header.
+    """
+    accepts = sorted(
+        getattr(ACCEPT, i) for i in dir(ACCEPT) if '__' not in i)
+    if accept not in accepts:
+        raise Exception(
+            'Invalid format. '
+            'Available formats are: {}'.format(accepts))
+
+
+class TTLCache(object):
+    """Small thread safe LRU cache whose entries expire after ttl seconds.
+
+    Each entry counts as 1 towards maxsize unless given another size
+    (eg. its length in bytes).
+    """
+
+    def __init__(self, maxsize, ttl):
+        """Constructor.
+
+        Args:
+            maxsize (int): maximum total size of the entries kept.
+            ttl (float): seconds an entry stays valid.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def get(self, key, default=None):
+        """Get a cached value.
+
+        Args:
+            key (hashable): cache key.
+            default (any[optional]): returned on miss or expired entry.
+        Returns:
+            cached value or default.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value, size = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self._size -= size
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, size=1):
+        """Cache a value, evicting the least recently used entries when full.
+        Values larger than maxsize are not cached.
+
+        Args:
+            key (hashable): cache key.
+            value (any): value to cache.
+            size (int[optional]): size of the value.
+        """
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._size -= old[2]
+            if size > self.maxsize:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value, size)
+            self._size += size
+            while self._size > self.maxsize:
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._size -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._size = 0
+
+
 class UTIL(object):
     """Utility class for making requests."""
 
+    # Raw bodies of responses carrying an ETag or Last-Modified header are
+    # kept (up to CONDITIONAL_CACHE_BYTES in total) to revalidate them with
+    # a conditional GET, and parsed again on 304 Not Modified.
+    CONDITIONAL_CACHE_BYTES = 8 * 1024 * 1024
+    CONDITIONAL_CACHE_TTL = 86400
+
     def __init__(self, user_agent='', accept=None, show_uri=False):
         """Constructor.
 
@@ -21,17 +242,34 @@ class UTIL(object):
         """
         self._show_uri = show_uri
         self._user_agent = user_agent
+        self._session = self._create_session()
+        # Content-Encoding negotiated with the api is shown once per session.
+        self._content_encoding_shown = False
+        self._conditional_cache = TTLCache(
+            maxsize=self.CONDITIONAL_CACHE_BYTES,
+            ttl=self.CONDITIONAL_CACHE_TTL)
 
         if accept:
-            accepts = [getattr(ACCEPT, i)
-                       for i in dir(ACCEPT) if '__' not in i]
-            accepts = sorted(accepts)
-            if accept not in accepts:
-                raise Exception(
-                    'Invalid format. '
-                    'Available formats are: {}'.format(accepts))
+            check_accept(accept)
             self._accept = accept
 
+    def _create_session(self):
+        """Create the http session shared by all requests of this instance,
+        so connections (and TLS handshakes) are reused between calls.
+
+        Returns:
+            requests.Session: session with a pooled https adapter.
+        """
+        session = requests.Session()
+        session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        session.mount('https://', requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=8))
+        return session
+
+    def close(self):
+        """Close the underlying http session and its pooled connections."""
+        self._session.close()
+
     def _retry_request_decorator(max_retries):
         def _retry_request_sub_decorator(request):
             @wraps(request)
@@ -45,9 +283,10 @@ class UTIL(object):
                         status_code == '' or status_code != 200)):
                     response, err = request(*args, **kargs)
                     
-                    # If the response has a 200 status code then return it right away
+                    # If the response has a 200 (or 304 to a conditional
+                    # request) status code then return it right away
                     if hasattr(response, "status_code"):
-                        if response.status_code == 200:
+                        if response.status_code in (200, 304):
                             return response
                         elif response.status_code == 503:
                             raise ServiceUnavilableError("NOAA services are reportedly offline.")
@@ -109,11 +348,12 @@ class UTIL(object):
         }
 
     @_retry_request_decorator(3)
-    def _get(self, end_point, uri, header, timeout=5):
+    def _get(self, end_point, uri, header, timeout=5, stream=False):
         response = None
         try:
-            response = requests.get(
-                'https://{}/{}'.format(end_point, uri), headers=header, timeout=timeout)
+            response = self._session.get(
+                'https://{}/{}'.format(end_point, uri), headers=header,
+                timeout=timeout, stream=stream)
         except Exception as err:
             if self._show_uri:
                 print('Caught exception: {}'.format(str(err)))
@@ -123,8 +363,8 @@ class UTIL(object):
             return response, err
         return response, None
 
-    def make_get_request(self, uri, header=None, end_point=None):
-        """Encapsulate code for GET request.
+    def _prepare_request(self, uri, header=None, end_point=None):
+        """Resolve end point, uri and header of a GET request.
 
         Args:
             uri (str): full get url with query string.
@@ -132,9 +372,8 @@ class UTIL(object):
             end_point (str): end point host.
 
         Returns:
-            dict: dictionary response.
+            tuple: end point, uri and header.
         """
-
         if self._show_uri:
             print('Calling: {}'.format(uri))
         if not header:
@@ -147,9 +386,95 @@ class UTIL(object):
             end_point = uri.split('/')[0]
             uri = uri.replace(end_point, '')
 
+        return end_point, uri, header
+
+    def make_get_request(self, uri, header=None, end_point=None):
+        """Encapsulate code for GET request.
+
+        Responses with an ETag or Last-Modified header are revalidated on
+        the next request of the same uri, and reused when the api answers
+        304 Not Modified.
+
+        Args:
+            uri (str): full get url with query string.
+            header (dict): request header.
+            end_point (str): end point host.
+
+        Returns:
+            dict: dictionary response.
+        """
+        end_point, uri, header = self._prepare_request(uri, header, end_point)
+
+        cache_key = (end_point, uri, header.get('accept'))
+        cached = self._conditional_cache.get(cache_key)
+        if cached is not None:
+            etag, last_modified, body = cached
+            header = dict(header)
+            if etag:
+                header['If-None-Match'] = etag
+            if last_modified:
+                header['If-Modified-Since'] = last_modified
+
         res = self._get(end_point, uri, header)
+        if (self._show_uri and not self._content_encoding_shown and
+                res.status_code == 200):
+            self._content_encoding_shown = True
+            print('Content-Encoding: {}'.format(
+                res.headers.get('Content-Encoding')))
+        if res.status_code == 304 and cached is not None:
+            return json_loads(body)
+
+        body = res.content
+        etag = res.headers.get('ETag')
+        last_modified = res.headers.get('Last-Modified')
+        if res.status_code == 200 and (etag or last_modified):
+            self._conditional_cache.set(
+                cache_key, (etag, last_modified, body), size=len(body))
+        return json_loads(body)
+
+    def make_get_raw_request(self, uri, header=None, end_point=None):
+        """Same as make_get_request() but returns the raw response body,
+        for callers extracting a few values without parsing the json.
+
+        Args:
+            uri (str): full get url with query string.
+            header (dict): request header.
+            end_point (str): end point host.
+
+        Returns:
+            bytes: response body.
+        """
+        end_point, uri, header = self._prepare_request(uri, header, end_point)
 
-        return res.json()
+        return self._get(end_point, uri, header).content
+
+    def make_get_stream_request(self, uri, prefix, header=None, end_point=None):
+        """Encapsulate code for GET request whose json response is parsed
+        incrementally, yielding the objects under prefix as they arrive.
+
+        Falls back to parsing the whole response when ijson is not installed.
+
+        Args:
+            uri (str): full get url with query string.
+            prefix (str): ijson prefix of the objects to yield
+                (eg. 'features.item').
+            header (dict): request header.
+            end_point (str): end point host.
+
+        Returns:
+            generator: objects found under prefix.
+        """
+        end_point, uri, header = self._prepare_request(uri, header, end_point)
+
+        res = self._get(end_point, uri, header, stream=True)
+        try:
+            if ijson is None:
+                yield from iter_json_prefix(json_loads(res.content), prefix)
+                return
+            res.raw.decode_content = True
+            yield from ijson.items(res.raw, prefix, use_float=True)
+        finally:
+            res.close()
 
     def parse_param_timestamp(self, str_date_time):
         """Parse string to datetime object.
@@ -8,8 +8,15 @@ setup(name='noaa-sdk',
       version='0.2.1',
       description='NOAA API (V3) Python 3 SDK.',
       install_requires=[
-          'requests==2.22.0'
+          'requests==2.22.0',
+          'numpy'
       ],
+      extras_require={
+          'async': ['aiohttp'],
+          'stream': ['ijson>=3.1'],
+          'orjson': ['orjson'],
+          'compression': ['brotli', 'zstandard']
+      },
       classifiers=[
           'Development Status :: 3 - Alpha',
           'License :: OSI Approved :: MIT License',
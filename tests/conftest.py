@@ -0,0 +1,6 @@
+import sys
+
+collect_ignore = []
+# AsyncNOAA uses async generators (3.6+) and its tests use asyncio.run (3.7+).
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_async_noaa.py')
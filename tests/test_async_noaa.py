@@ -0,0 +1,218 @@
+from __future__ import absolute_import
+from __future__ import print_function
+from unittest.mock import patch
+import asyncio
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from noaa_sdk import async_noaa
+
+
+def test_instantiation():
+    """Test instantiation of AsyncNOAA class.
+    """
+    n = async_noaa.AsyncNOAA()
+    assert n._user_agent == n.DEFAULT_USER_AGENT
+    assert n._session is None
+
+
+@patch('noaa_sdk.async_noaa.AsyncNOAA._get')
+def test_points_forecast(mock_get):
+    mock_get.return_value = {
+        'properties': {
+            'forecast': 'forecast_uri',
+            'forecastHourly': 'forecast_hourly_uri',
+            'forecastGridData': 'forecast_grid_uri'
+        }
+    }
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    res = asyncio.run(
+        n.points_forecast(23.44, 34.55, data_type=['hourly', 'grid']))
+    assert len(res) == 2
+    mock_get.assert_any_call(
+        'forecast_hourly_uri', end_point=n.DEFAULT_END_POINT)
+    mock_get.assert_any_call(
+        'forecast_grid_uri', end_point=n.DEFAULT_END_POINT)
+
+
+@patch('noaa_sdk.async_noaa.AsyncNOAA._get')
+def test_get_observations_by_lat_lon(mock_get):
+    def get(uri, end_point=None):
+        if uri.startswith('/points/'):
+            return {'properties': {'observationStations': 'stations_uri'}}
+        if uri == 'stations_uri':
+            return {'observationStations': [
+                'https://api.weather.gov/stations/A',
+                'https://api.weather.gov/stations/B',
+                'https://api.weather.gov/stations/C']}
+        return {'features': [{'properties': {'station': uri}}]}
+    mock_get.side_effect = get
+
+    async def collect(n):
+        res = []
+        async for o in n.get_observations_by_lat_lon(
+                23.44, 34.55, num_of_stations=2):
+            res.append(o)
+        return res
+
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    res = asyncio.run(collect(n))
+    assert sorted(o['station'] for o in res) == [
+        '/stations/A/observations', '/stations/B/observations']
+
+
+
+def test_get_observations_by_lat_lon_cancels_pending_stations():
+    started = []
+    cancelled = []
+
+    async def get(uri, end_point=None):
+        if uri.startswith('/points/'):
+            return {'properties': {'observationStations': 'stations_uri'}}
+        return {'observationStations': [
+            'https://api.weather.gov/stations/A',
+            'https://api.weather.gov/stations/B',
+            'https://api.weather.gov/stations/C']}
+
+    async def stations_observations(station_id, **params):
+        started.append(station_id)
+        if station_id == 'A':
+            raise Exception('station A failed')
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.append(station_id)
+            raise
+
+    async def collect(n):
+        res = []
+        async for o in n.get_observations_by_lat_lon(
+                23.44, 34.55, num_of_stations=-1):
+            res.append(o)
+        return res
+
+    async def main(n):
+        with pytest.raises(Exception) as err:
+            await collect(n)
+        # Let the cancelled tasks run their CancelledError handlers.
+        await asyncio.sleep(0)
+        return err, list(cancelled)
+
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    n._get = get
+    n.stations_observations = stations_observations
+    err, cancelled_before_exit = asyncio.run(main(n))
+    assert str(err.value) == 'station A failed'
+    assert sorted(started) == ['A', 'B', 'C']
+    assert sorted(cancelled_before_exit) == ['B', 'C']
+
+
+@patch('noaa_sdk.async_noaa.AsyncNOAA._get')
+def test_stations_observations_current_and_record_id(mock_get):
+    mock_get.return_value = {'properties': {}}
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    asyncio.run(n.stations_observations('KJFK', current=True))
+    mock_get.assert_called_with(
+        '/stations/KJFK/observations/current', end_point=n.DEFAULT_END_POINT)
+    asyncio.run(n.stations_observations(
+        'KJFK', recordId='2017-01-04T18:54:00+00:00'))
+    mock_get.assert_called_with(
+        '/stations/KJFK/observations/2017-01-04T18:54:00+00:00',
+        end_point=n.DEFAULT_END_POINT)
+    with pytest.raises(Exception):
+        asyncio.run(n.stations_observations(
+            'KJFK', current=True, recordId='2017-01-04T18:54:00+00:00'))
+
+class FakeResponse(object):
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    async def json(self, content_type=None):
+        return self.body
+
+    async def text(self):
+        return str(self.body)
+
+
+class FakeSession(object):
+    closed = False
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url):
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@patch('noaa_sdk.async_noaa.asyncio.sleep')
+def test_get_retries_then_raises(mock_sleep):
+    async def sleep(seconds):
+        pass
+    mock_sleep.side_effect = sleep
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    n._session = FakeSession(
+        [FakeResponse(404, {'title': 'Not Found'})] * (n.MAX_RETRIES + 1))
+    with pytest.raises(async_noaa.RetryTimeoutError):
+        asyncio.run(n._get('/points/1,1', end_point=n.DEFAULT_END_POINT))
+    assert n._session.calls == n.MAX_RETRIES + 1
+    assert [c[0][0] for c in mock_sleep.call_args_list] == [2, 3, 5]
+
+
+@patch('noaa_sdk.async_noaa.asyncio.sleep')
+def test_get_returns_json_after_retry(mock_sleep):
+    async def sleep(seconds):
+        pass
+    mock_sleep.side_effect = sleep
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    n._session = FakeSession([
+        FakeResponse(500, {'title': 'Unexpected Problem'}),
+        FakeResponse(200, {'properties': {}})])
+    res = asyncio.run(n._get('/points/1,1', end_point=n.DEFAULT_END_POINT))
+    assert res == {'properties': {}}
+
+
+@patch('noaa_sdk.async_noaa.asyncio.sleep')
+def test_get_retries_on_timeout(mock_sleep):
+    async def sleep(seconds):
+        pass
+    mock_sleep.side_effect = sleep
+
+    class TimeoutResponse(FakeResponse):
+        async def __aenter__(self):
+            raise asyncio.TimeoutError()
+
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    n._session = FakeSession([
+        TimeoutResponse(None, None), FakeResponse(200, {'properties': {}})])
+    res = asyncio.run(n._get('/points/1,1', end_point=n.DEFAULT_END_POINT))
+    assert res == {'properties': {}}
+    assert n._session.calls == 2
+
+
+def test_get_service_unavailable():
+    n = async_noaa.AsyncNOAA(user_agent='test_agent')
+    n._session = FakeSession([FakeResponse(503, {})])
+    with pytest.raises(async_noaa.ServiceUnavilableError):
+        asyncio.run(n._get('/points/1,1', end_point=n.DEFAULT_END_POINT))
+
+
+def test_sync_methods_not_exposed():
+    n = async_noaa.AsyncNOAA()
+    assert not hasattr(n, 'make_get_request')
+    assert not hasattr(n, 'make_get_raw_request')
+    assert not hasattr(n, 'make_get_stream_request')
+
+
+def test_invalid_accept():
+    with pytest.raises(Exception):
+        async_noaa.AsyncNOAA(accept='text/plain')
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 from __future__ import print_function
 from unittest.mock import patch
 from noaa_sdk import noaa
+from noaa_sdk import util
 import pytest
 
 try:
@@ -10,6 +11,19 @@ except:
     from mock import MagicMock
 
 
+MOCK_POINTS_BODY = b'''{
+    "@context": ["https://geojson.org/geojson-ld/geojson-context.jsonld",
+                 {"forecast": {"@id": "wx:forecast", "@type": "@id"}}],
+    "properties": {
+        "forecastOffice": "https://api.weather.gov/offices/OKX",
+        "forecast": "forecast_uri",
+        "forecastHourly": "forecast_hourly_uri",
+        "forecastGridData": "forecast_grid_uri",
+        "observationStations": "stations_uri"
+    }
+}'''
+
+
 def test_instantiation():
     """Test instantiation of NOAA class.
     """
@@ -60,9 +74,9 @@ def test_get_request_header():
 def test_make_get_request(mock_requests):
     mock_response_obj = MagicMock()
     mock_response_obj.text = 'mock text'
-    mock_response_obj.json = lambda: {"test":"test"}
+    mock_response_obj.content = b'{"test":"test"}'
     mock_response_obj.status_code = 200
-    mock_requests.get.return_value = mock_response_obj
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
 
     n = noaa.NOAA(user_agent='test_agent')
     res = n.make_get_request(
@@ -76,7 +90,7 @@ def test_make_get_request_failed(mock_requests):
     mock_response_obj.text = 'mock text'
     mock_response_obj.status_code = 500
     mock_response_obj.json = lambda: {"test":"test"}
-    mock_requests.get.return_value = mock_response_obj
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
 
     with pytest.raises(Exception) as err:
         n = noaa.NOAA(user_agent='test_agent')
@@ -84,6 +98,23 @@ def test_make_get_request_failed(mock_requests):
         assert err == 'Error: end_point is None.'
 
 
+@patch('noaa_sdk.util.requests')
+def test_session_is_shared(mock_requests):
+    mock_response_obj = MagicMock()
+    mock_response_obj.content = b'{"test": "test"}'
+    mock_response_obj.status_code = 200
+    mock_session = mock_requests.Session.return_value
+    mock_session.get.return_value = mock_response_obj
+
+    n = noaa.NOAA(user_agent='test_agent')
+    n.make_get_request('/points/1,2', end_point='test.paulo.com')
+    n.make_get_request('/points/3,4', end_point='test.paulo.com')
+    assert mock_requests.Session.call_count == 1
+    assert mock_session.get.call_count == 2
+    n.close()
+    mock_session.close.assert_called_once_with()
+
+
 @patch('noaa_sdk.noaa.NOAA.make_get_request')
 def test_points(mock_make_get_request):
     mock_make_get_request.return_value = None
@@ -102,8 +133,10 @@ def test_points_with_stations(mock_make_get_request):
         '/points/23.44,34.55/stations', end_point=n.DEFAULT_END_POINT)
 
 
+@patch('noaa_sdk.noaa.NOAA.make_get_raw_request')
 @patch('noaa_sdk.noaa.NOAA.make_get_request')
-def test_points_forecast(mock_make_get_request):
+def test_points_forecast(mock_make_get_request, mock_make_get_raw_request):
+    mock_make_get_raw_request.return_value = MOCK_POINTS_BODY
     mock_make_get_request.return_value = {
         'properties': {
             'forecast': 'forecast_uri',
@@ -114,10 +147,15 @@ def test_points_forecast(mock_make_get_request):
     n.points_forecast(23.44, 34.55, data_type=None)
     mock_make_get_request.assert_any_call(
         uri='forecast_uri', end_point=n.DEFAULT_END_POINT)
+    mock_make_get_raw_request.assert_called_once_with(
+        '/points/23.4400,34.5500', end_point=n.DEFAULT_END_POINT)
 
 
+@patch('noaa_sdk.noaa.NOAA.make_get_raw_request')
 @patch('noaa_sdk.noaa.NOAA.make_get_request')
-def test_points_forecast_with_hourly(mock_make_get_request):
+def test_points_forecast_with_hourly(
+        mock_make_get_request, mock_make_get_raw_request):
+    mock_make_get_raw_request.return_value = MOCK_POINTS_BODY
     mock_make_get_request.return_value = {
         'properties': {
             'forecast': 'forecast_hourly_uri',
@@ -337,3 +375,499 @@ def test_active_alerts_with_region(mock_make_get_request):
     n.active_alerts(region='test_region')
     mock_make_get_request.assert_called_with(
         '/alerts/active/region/test_region', end_point=n.DEFAULT_END_POINT)
+
+
+def test_ttl_cache():
+    cache = noaa.TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert len(cache) == 2
+
+    sized = noaa.TTLCache(maxsize=10, ttl=60)
+    sized.set('a', b'aaaa', size=4)
+    sized.set('b', b'bbbbbb', size=6)
+    sized.set('c', b'cc', size=2)
+    assert 'a' not in sized
+    assert 'b' in sized
+    sized.set('d', b'd' * 11, size=11)
+    assert 'd' not in sized
+
+    expired = noaa.TTLCache(maxsize=2, ttl=-1)
+    expired.set('a', 1)
+    assert expired.get('a') is None
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_cached(mock_make_get_request):
+    mock_make_get_request.return_value = {'properties': {}}
+    n = noaa.NOAA(user_agent='test_agent')
+    n.points('23.44,34.55')
+    n.points('23.44,34.55')
+    assert mock_make_get_request.call_count == 1
+    n.clear_cache()
+    n.points('23.44,34.55')
+    assert mock_make_get_request.call_count == 2
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_cached_response_not_shared(mock_make_get_request):
+    mock_make_get_request.return_value = {'properties': {'forecast': 'a'}}
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.points('23.44,34.55')
+    res['properties']['forecast'] = 'b'
+    assert n.points('23.44,34.55') == {'properties': {'forecast': 'a'}}
+    assert mock_make_get_request.call_count == 1
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_error_not_cached(mock_make_get_request):
+    mock_make_get_request.return_value = {'status': 500, 'detail': 'error'}
+    n = noaa.NOAA(user_agent='test_agent')
+    n.points('23.44,34.55')
+    n.points('23.44,34.55')
+    assert mock_make_get_request.call_count == 2
+
+
+@patch('noaa_sdk.noaa.SearchEngine')
+def test_get_lat_lon_by_postalcode_country_memoized(mock_search_engine):
+    noaa._US_SEARCH_ENGINES.clear()
+    noaa._resolve_postal_code.cache_clear()
+    zipcode = MagicMock(lat=40.73, lng=-73.79)
+    mock_search_engine.return_value.by_zipcode.return_value = zipcode
+
+    n = noaa.NOAA(user_agent='test_agent')
+    assert n.get_lat_lon_by_postalcode_country('11365') == (40.73, -73.79)
+    assert n.get_lat_lon_by_postalcode_country('11365') == (40.73, -73.79)
+    assert n.get_lat_lon_by_postalcode_country(
+        '11365', return_result_object=True) == (40.73, -73.79, zipcode)
+    assert mock_search_engine.call_count == 1
+    assert mock_search_engine.return_value.by_zipcode.call_count == 2
+    noaa._US_SEARCH_ENGINES.clear()
+    noaa._resolve_postal_code.cache_clear()
+
+
+@patch('noaa_sdk.noaa.SearchEngine')
+def test_get_lat_lon_by_postalcode_country_invalid(mock_search_engine):
+    noaa._US_SEARCH_ENGINES.clear()
+    noaa._resolve_postal_code.cache_clear()
+    mock_search_engine.return_value.by_zipcode.return_value = MagicMock(
+        lat=None, lng=None)
+
+    n = noaa.NOAA(user_agent='test_agent')
+    with pytest.raises(noaa.InvalidZipCodeError):
+        n.get_lat_lon_by_postalcode_country('00000')
+    noaa._US_SEARCH_ENGINES.clear()
+
+
+@patch('noaa_sdk.noaa._geonames_postal_codes')
+def test_get_lat_lon_bulk(mock_geonames_postal_codes):
+    mock_geonames_postal_codes.return_value = {
+        '75001': (48.86, 2.35), '69001': (45.76, 4.83)}
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.get_lat_lon_bulk(['75001', '69001'], country='FR')
+    assert res.tolist() == [[48.86, 2.35], [45.76, 4.83]]
+
+
+@patch('noaa_sdk.noaa._geonames_postal_codes')
+def test_get_lat_lon_bulk_invalid(mock_geonames_postal_codes):
+    mock_geonames_postal_codes.return_value = {'75001': (48.86, 2.35)}
+    n = noaa.NOAA(user_agent='test_agent')
+    with pytest.raises(noaa.InvalidZipCodeError) as err:
+        n.get_lat_lon_bulk(['75001', '00000'], country='FR')
+    assert str(err.value) == "Invalid ZIP Code at index [1]: ['00000']"
+
+
+def test_parse_geonames():
+    lines = [
+        'FR\t75001\tParis 01\t\t\t\t\t\t\t48.86\t2.34\t5\n',
+        'FR\t75001\tParis 01 bis\t\t\t\t\t\t\t48.88\t2.36\t5\n',
+        'FR\t69001\tLyon 01\t\t\t\t\t\t\t45.76\t4.83\t5\n',
+    ]
+    table = noaa._parse_geonames(lines)
+    assert table['69001'] == (45.76, 4.83)
+    assert [round(i, 2) for i in table['75001']] == [48.87, 2.35]
+
+
+@patch('noaa_sdk.noaa._geonames_postal_codes')
+def test_get_lat_lon_by_postalcode_country_geonames(
+        mock_geonames_postal_codes):
+    noaa._resolve_postal_code.cache_clear()
+    mock_geonames_postal_codes.return_value = {'T0A': (54.76, -111.25)}
+    n = noaa.NOAA(user_agent='test_agent')
+    assert n.get_lat_lon_by_postalcode_country(
+        't0a 1a0', 'CA') == (54.76, -111.25)
+    with pytest.raises(noaa.InvalidZipCodeError):
+        n.get_lat_lon_by_postalcode_country('X9X 9X9', 'CA')
+    noaa._resolve_postal_code.cache_clear()
+
+
+def test_build_uri():
+    assert noaa.build_uri('/alerts') == '/alerts'
+    assert noaa.build_uri('/alerts', {}) == '/alerts'
+    assert noaa.build_uri('/alerts', {'zone': ['A', 'B']}) == (
+        '/alerts?zone=A&zone=B')
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_stations_observations_with_limit(mock_make_get_request):
+    mock_make_get_request.return_value = {'features': []}
+    n = noaa.NOAA(user_agent='test_agent')
+    n.stations_observations('PAULOSTATION', limit=5)
+    mock_make_get_request.assert_called_with(
+        '/stations/PAULOSTATION/observations?limit=5',
+        end_point=n.DEFAULT_END_POINT)
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_forecast_with_points_response(mock_make_get_request):
+    mock_make_get_request.return_value = {}
+    n = noaa.NOAA(user_agent='test_agent')
+    n.points_forecast(23.44, 34.55, data_type="grid", points_response={
+        'properties': {
+            'forecast': 'forecast_uri',
+            'forecastGridData': 'forecast_grid_uri'}})
+    mock_make_get_request.assert_called_once_with(
+        uri='forecast_grid_uri', end_point=n.DEFAULT_END_POINT)
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_raw_request')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+@patch('noaa_sdk.noaa.NOAA.get_lat_lon_by_postalcode_country')
+def test_get_forecasts_requests_points_once(
+        mock_get_lat_lon, mock_make_get_request, mock_make_get_raw_request):
+    mock_get_lat_lon.return_value = (23.44, 34.55)
+    mock_make_get_raw_request.return_value = MOCK_POINTS_BODY
+    mock_make_get_request.return_value = {
+        'properties': {
+            'forecast': 'forecast_uri',
+            'forecastGridData': 'forecast_grid_uri',
+            'observationStations': 'stations_uri',
+        },
+        'observationStations': [],
+    }
+    n = noaa.NOAA(user_agent='test_agent')
+    n.get_forecasts('11365', 'US')
+    list(n.get_observations('11365', 'US'))
+    mock_make_get_raw_request.assert_called_once_with(
+        '/points/23.4400,34.5500', end_point=n.DEFAULT_END_POINT)
+
+
+@pytest.mark.skipif(util.ijson is None, reason='ijson is not installed')
+@patch('noaa_sdk.util.requests')
+def test_make_get_stream_request(mock_requests):
+    import io
+    mock_response_obj = MagicMock()
+    mock_response_obj.status_code = 200
+    mock_response_obj.raw = io.BytesIO(
+        b'{"features": [{"properties": {"a": 1.5}}, {"properties": {}}]}')
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
+
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.make_get_stream_request(
+        '/stations/A/observations', 'features.item',
+        end_point='test.paulo.com')
+    assert list(res) == [{"properties": {"a": 1.5}}, {"properties": {}}]
+    mock_response_obj.close.assert_called_once_with()
+
+
+@patch('noaa_sdk.util.ijson', None)
+@patch('noaa_sdk.util.requests')
+def test_make_get_stream_request_without_ijson(mock_requests):
+    mock_response_obj = MagicMock()
+    mock_response_obj.status_code = 200
+    mock_response_obj.content = (
+        b'{"features": [{"properties": {"a": 1.5}}, {"properties": {}}]}')
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
+
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.make_get_stream_request(
+        '/stations/A/observations', 'features.item.properties',
+        end_point='test.paulo.com')
+    assert list(res) == [{"a": 1.5}, {}]
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_stream_request')
+def test_stations_observations_stream(mock_make_get_stream_request):
+    mock_make_get_stream_request.return_value = iter([])
+    n = noaa.NOAA(user_agent='test_agent')
+    n.stations_observations_stream('PAULOSTATION', start='2017-01-01')
+    mock_make_get_stream_request.assert_called_with(
+        '/stations/PAULOSTATION/observations?start=2017-01-01T00%3A00%3A00Z',
+        'features.item', end_point=n.DEFAULT_END_POINT)
+    with pytest.raises(Exception):
+        n.stations_observations_stream('PAULOSTATION', current=True)
+
+
+def test_to_iso_timestamp():
+    assert noaa.to_iso_timestamp('2017-01-01') == '2017-01-01T00:00:00Z'
+    assert noaa.to_iso_timestamp(
+        '2017-01-01', end=True) == '2017-01-01T23:59:59Z'
+    assert noaa.to_iso_timestamp(
+        '2017-01-01 10:20:30') == '2017-01-01T10:20:30Z'
+    assert noaa.to_iso_timestamp(
+        '2017-01-01T10:20:30Z', end=True) == '2017-01-01T10:20:30Z'
+    with pytest.raises(Exception):
+        noaa.to_iso_timestamp('01/01/2017')
+    with pytest.raises(Exception):
+        noaa.to_iso_timestamp('2017-02-30')
+    with pytest.raises(Exception):
+        noaa.to_iso_timestamp('2017-13-99 25:61:61')
+    from datetime import datetime
+    for value in (datetime(2017, 1, 1), None):
+        with pytest.raises(Exception) as err:
+            noaa.to_iso_timestamp(value)
+        assert type(err.value) is Exception
+        assert 'start and end must have format' in str(err.value)
+
+
+@patch('noaa_sdk.noaa.SearchEngine')
+def test_uszipcode_search_engine_shared_between_threads(mock_search_engine):
+    from concurrent.futures import ThreadPoolExecutor
+    noaa._US_SEARCH_ENGINES.clear()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        engines = list(pool.map(
+            lambda _: noaa._uszipcode_search_engine(), range(8)))
+    assert mock_search_engine.call_count == 1
+    assert all(e is engines[0] for e in engines)
+    noaa._US_SEARCH_ENGINES.clear()
+
+
+@patch('noaa_sdk.util.orjson', None)
+def test_json_loads_without_orjson():
+    assert util.json_loads(b'{"test": [1, 2.5]}') == {"test": [1, 2.5]}
+
+
+@patch('noaa_sdk.noaa.requests')
+def test_geonames_postal_codes_cached_on_disk(mock_requests, tmpdir):
+    import io
+    import zipfile
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(
+            'FR.txt', 'FR\t75001\tParis 01\t\t\t\t\t\t\t48.86\t2.34\t5\n')
+    mock_requests.get.return_value.content = buffer.getvalue()
+
+    with patch('noaa_sdk.noaa.GEONAMES_CACHE_DIR', str(tmpdir)):
+        noaa._geonames_postal_codes.cache_clear()
+        assert noaa._geonames_postal_codes('FR') == {'75001': (48.86, 2.34)}
+        noaa._geonames_postal_codes.cache_clear()
+        assert noaa._geonames_postal_codes('FR') == {'75001': (48.86, 2.34)}
+        noaa._geonames_postal_codes.cache_clear()
+    assert mock_requests.get.call_count == 1
+    assert tmpdir.join('FR.json').check()
+
+
+@patch('noaa_sdk.noaa.requests')
+def test_geonames_postal_codes_rebuilds_corrupted_table(
+        mock_requests, tmpdir):
+    tmpdir.join('FR.txt').write(
+        'FR\t75001\tParis 01\t\t\t\t\t\t\t48.86\t2.34\t5\n')
+    tmpdir.join('FR.json').write('{"75001": [48.8')
+
+    with patch('noaa_sdk.noaa.GEONAMES_CACHE_DIR', str(tmpdir)):
+        noaa._geonames_postal_codes.cache_clear()
+        assert noaa._geonames_postal_codes('FR') == {'75001': (48.86, 2.34)}
+        noaa._geonames_postal_codes.cache_clear()
+    assert not mock_requests.get.called
+    assert tmpdir.join('FR.json').read() == '{"75001": [48.86, 2.34]}'
+    assert sorted(f.basename for f in tmpdir.listdir()) == [
+        'FR.json', 'FR.txt']
+
+
+@patch('noaa_sdk.noaa.requests')
+def test_geonames_postal_codes_concurrent_first_calls(mock_requests, tmpdir):
+    import io
+    import threading
+    import zipfile
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr(
+            'FR.txt', 'FR\t75001\tParis 01\t\t\t\t\t\t\t48.86\t2.34\t5\n')
+    mock_requests.get.return_value.content = buffer.getvalue()
+
+    results = []
+    with patch('noaa_sdk.noaa.GEONAMES_CACHE_DIR', str(tmpdir)):
+        noaa._geonames_postal_codes.cache_clear()
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    noaa._geonames_postal_codes('FR')))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        noaa._geonames_postal_codes.cache_clear()
+    assert results == [{'75001': (48.86, 2.34)}] * 4
+    assert mock_requests.get.call_count == 1
+
+
+@patch('noaa_sdk.util.requests')
+def test_make_get_request_conditional(mock_requests):
+    ok_response = MagicMock()
+    ok_response.status_code = 200
+    ok_response.content = b'{"test": "test"}'
+    ok_response.headers = {'ETag': '"abc"'}
+    not_modified_response = MagicMock()
+    not_modified_response.status_code = 304
+    not_modified_response.content = b''
+    not_modified_response.headers = {'ETag': '"abc"'}
+    mock_session = mock_requests.Session.return_value
+    mock_session.get.side_effect = [ok_response, not_modified_response]
+
+    n = noaa.NOAA(user_agent='test_agent')
+    first = n.make_get_request('/alerts/active', end_point='test.paulo.com')
+    first['test'] = 'changed'
+    second = n.make_get_request('/alerts/active', end_point='test.paulo.com')
+    assert second == {"test": "test"}
+    first_headers = mock_session.get.call_args_list[0][1]['headers']
+    assert first is not second
+    second_headers = mock_session.get.call_args_list[1][1]['headers']
+    assert 'If-None-Match' not in first_headers
+    assert second_headers['If-None-Match'] == '"abc"'
+
+
+@patch('noaa_sdk.util.requests')
+def test_make_get_request_shows_content_encoding_once(mock_requests, capsys):
+    mock_response_obj = MagicMock()
+    mock_response_obj.status_code = 200
+    mock_response_obj.content = b'{"test": "test"}'
+    mock_response_obj.headers = {'Content-Encoding': 'gzip'}
+    mock_requests.Session.return_value.get.return_value = mock_response_obj
+
+    n = noaa.NOAA(user_agent='test_agent', show_uri=True)
+    n.make_get_request('/alerts/active', end_point='test.paulo.com')
+    n.make_get_request('/alerts/active', end_point='test.paulo.com')
+    out, _ = capsys.readouterr()
+    assert out.count('Content-Encoding: gzip') == 1
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_points_forecast_with_several_data_types(mock_make_get_request):
+    mock_make_get_request.side_effect = lambda uri, end_point: {'uri': uri}
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.points_forecast(
+        23.44, 34.55, data_type=['hourly', 'grid'], points_response={
+            'properties': {
+                'forecastHourly': 'forecast_hourly_uri',
+                'forecastGridData': 'forecast_grid_uri'}})
+    assert res == [
+        {'uri': 'forecast_hourly_uri'}, {'uri': 'forecast_grid_uri'}]
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_stream_request')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_observations_by_lat_lon_with_several_stations(
+        mock_make_get_request, mock_make_get_stream_request):
+    mock_make_get_request.return_value = {'observationStations': [
+        'https://api.weather.gov/stations/A',
+        'https://api.weather.gov/stations/B',
+        'https://api.weather.gov/stations/C']}
+    mock_make_get_stream_request.side_effect = (
+        lambda uri, prefix, end_point: iter([{'station': uri.split('/')[2]}]))
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.get_observations_by_lat_lon(
+        23.44, 34.55, num_of_stations=2, points_response={
+            'properties': {'observationStations': 'stations_uri'}})
+    assert list(res) == [{'station': 'A'}, {'station': 'B'}]
+    mock_make_get_stream_request.assert_called_with(
+        '/stations/B/observations', 'features.item.properties',
+        end_point=n.DEFAULT_END_POINT)
+    n.close()
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_stream_request')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_observation_stations_cached(
+        mock_make_get_request, mock_make_get_stream_request):
+    mock_make_get_request.return_value = {'observationStations': [
+        'https://api.weather.gov/stations/A']}
+    mock_make_get_stream_request.return_value = iter([])
+    points_response = {'properties': {'observationStations': 'stations_uri'}}
+    n = noaa.NOAA(user_agent='test_agent')
+    list(n.get_observations_by_lat_lon(
+        23.44, 34.55, points_response=points_response))
+    list(n.get_observations_by_lat_lon(
+        23.44, 34.55, points_response=points_response))
+    mock_make_get_request.assert_called_once_with(
+        'stations_uri', end_point=n.DEFAULT_END_POINT)
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_products_types_with_locations(mock_make_get_request):
+    mock_make_get_request.return_value = None
+    n = noaa.NOAA(user_agent='test_agent')
+    n.products_types(locations=True, type_id='test_id')
+    mock_make_get_request.assert_called_with(
+        '/products/types/test_id/locations', end_point=n.DEFAULT_END_POINT)
+
+
+def test_accept_encoding():
+    n = noaa.NOAA(user_agent='test_agent')
+    encodings = n._session.headers['Accept-Encoding'].split(', ')
+    assert encodings == util.ACCEPT_ENCODING.split(', ')
+    assert 'gzip' in encodings
+    n.close()
+
+
+def test_accept_encoding_filtered_by_decodable_encodings():
+    assert util.accept_encoding(
+        'gzip,deflate,br,zstd') == 'zstd, br, gzip, deflate'
+    assert util.accept_encoding('gzip,deflate') == 'gzip, deflate'
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_raw_request')
+def test_points_minimal(mock_make_get_raw_request):
+    mock_make_get_raw_request.return_value = MOCK_POINTS_BODY
+    n = noaa.NOAA(user_agent='test_agent')
+    expected = {'properties': {
+        'forecast': 'forecast_uri',
+        'forecastHourly': 'forecast_hourly_uri',
+        'forecastGridData': 'forecast_grid_uri',
+        'observationStations': 'stations_uri'}}
+    assert n._points_minimal('23.44,34.55') == expected
+    assert n._points_minimal('23.44,34.55') == expected
+    assert mock_make_get_raw_request.call_count == 1
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_raw_request')
+def test_points_minimal_error_response(mock_make_get_raw_request):
+    mock_make_get_raw_request.return_value = (
+        b'{"status": 404, "detail": "Data Unavailable For Requested Point"}')
+    n = noaa.NOAA(user_agent='test_agent')
+    assert n._points_minimal('23.44,34.55') == {
+        'status': 404, 'detail': 'Data Unavailable For Requested Point'}
+
+
+def test_format_point():
+    assert noaa._format_point(23.44, -34.5) == '23.4400,-34.5000'
+    assert noaa._format_point(40.73141234, 1e-07) == '40.7314,0.0000'
+
+
+@patch('noaa_sdk.noaa.NOAA.make_get_stream_request')
+@patch('noaa_sdk.noaa.NOAA.make_get_request')
+def test_get_observations_by_lat_lon_fetches_stations_lazily(
+        mock_make_get_request, mock_make_get_stream_request):
+    from itertools import islice
+    mock_make_get_request.return_value = {'observationStations': [
+        'https://api.weather.gov/stations/{}'.format(i) for i in range(40)]}
+    fetched = []
+
+    def stream(uri, prefix, end_point):
+        fetched.append(uri)
+        yield {'station': uri}
+    mock_make_get_stream_request.side_effect = stream
+
+    n = noaa.NOAA(user_agent='test_agent')
+    res = n.get_observations_by_lat_lon(
+        23.44, 34.55, num_of_stations=-1, points_response={
+            'properties': {'observationStations': 'stations_uri'}})
+    assert list(islice(res, 1)) == [{'station': '/stations/0/observations'}]
+    n._pool.shutdown(wait=True)
+    assert len(fetched) <= n.STATIONS_WINDOW + 1
+    res.close()
+    n.close()